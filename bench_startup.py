@@ -0,0 +1,70 @@
+"""
+Startup benchmark for the bot.
+
+Measures, in a fresh interpreter each run:
+  - import time of main.py
+  - first-response latency: import + calling the /start handler with a stand-in update
+  - which heavy backends were loaded by the import (should be none with lazy loading;
+    httpx is not checked because python-telegram-bot imports it)
+
+Usage:
+    python bench_startup.py            # 5 runs
+    python bench_startup.py --runs 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Code run in a child interpreter so every run is a cold start
+CHILD = r'''
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+class _Message:
+    async def reply_text(self, text, **kwargs):
+        return None
+
+class _Update:
+    message = _Message()
+
+class _Context:
+    user_data = {}
+
+asyncio.run(main.start(_Update(), _Context()))
+responded = time.perf_counter()
+
+heavy = [name for name in main.WARM_UP_MODULES if name in sys.modules]
+print(json.dumps({
+    "import": imported - started,
+    "first_response": responded - started,
+    "heavy_loaded": heavy,
+}))
+'''
+
+
+def run_once():
+    result = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bot import and first-response latency.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    for metric in ("import", "first_response"):
+        values = [run[metric] * 1000 for run in runs]
+        print(f"{metric:>15}: median {statistics.median(values):7.1f} ms  min {min(values):7.1f} ms  max {max(values):7.1f} ms")
+
+    heavy = sorted({name for run in runs for name in run["heavy_loaded"]})
+    print(f"{'heavy modules':>15}: {', '.join(heavy) if heavy else 'none loaded at import'}")
+
+
+if __name__ == '__main__':
+    main()
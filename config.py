@@ -1,32 +1,104 @@
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Get the variables
-TOKEN = os.getenv('TELEGRAM_BOT_API')
-TIMEZONE = os.getenv('TIMEZONE')
-TIMEZONE_COMMON_NAME = os.getenv('TIMEZONE_COMMON_NAME')
-BOT_USERNAME = os.getenv('TELEGRAM_BOT_USERNAME')
-IMG_OCR_API_KEY  = os.getenv('IMG_OCR_API_KEY')  # Corrected line
-
-# Use the variables
-print(f"Token: {TOKEN}")
-print(f"Timezone: {TIMEZONE}")
-print(f"Timezone Common Name: {TIMEZONE_COMMON_NAME}")
-print(f"Bot Username: {BOT_USERNAME}")
-print(f"IMGOCR API Key: {IMG_OCR_API_KEY}")
-
-# Get the additional variables
-MONDAY_API_TOKEN = os.getenv('MONDAY_API_TOKEN')
-POLICY_BOARD_ID = os.getenv('POLICY_BOARD_ID')
-REFERRER_BOARD_ID = os.getenv('REFERRER_BOARD_ID')
-INSURANCE_BOARD_ID = os.getenv('INSURANCE_BOARD_ID')
-
-# Use the additional variables
-print(f"Monday API Token: {MONDAY_API_TOKEN}")
-print(f"Policy Board ID: {POLICY_BOARD_ID}")
-print(f"Referrer Board ID: {REFERRER_BOARD_ID}")
-print(f"Insurance Board ID: {INSURANCE_BOARD_ID}")
-print(f"IMGOCR API: {IMG_OCR_API_KEY}")
+import socket
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional
+
+# Importing this module has no side effects: nothing is read or printed until load_settings() is called.
+
+# Defaults for settings that are not secrets
+DEFAULT_AI_MODEL_ENDPOINT = "http://52.221.236.123:8502/extract-pdf"
+DEFAULT_PDF_FOLDER = Path.home() / "Projects" / "BingoTelegramBot" / "pdf_folder"
+DEFAULT_TELEGRAM_PDF_FOLDER = Path.home() / "Projects" / "BingoTelegramBot" / "telegram_pdf_folder"
+DEFAULT_IMAGE_FOLDER = Path("/Users/carlsaginsin/Projects/BingoTelegramBot/image_folder")
+DEFAULT_TESSERACT_CMD = '/opt/homebrew/bin/tesseract'
+
+
+def _env_ids(name: str) -> FrozenSet[int]:
+    # Comma-separated Telegram chat/user IDs
+    return frozenset(int(value) for value in os.getenv(name, "").split(",") if value.strip())
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed view of the bot's environment variables."""
+
+    telegram_token: Optional[str] = None
+    bot_username: Optional[str] = None
+    timezone: Optional[str] = None
+    timezone_common_name: Optional[str] = None
+    img_ocr_api_key: Optional[str] = None
+    monday_api_token: Optional[str] = None
+    policy_board_id: Optional[str] = None
+    referrer_board_id: Optional[str] = None
+    insurance_board_id: Optional[str] = None
+    service_account_file: Optional[str] = None
+    ai_model_endpoint: str = DEFAULT_AI_MODEL_ENDPOINT
+    pdf_folder: Path = DEFAULT_PDF_FOLDER  # Watched for WhatsApp PDFs
+    telegram_pdf_folder: Path = DEFAULT_TELEGRAM_PDF_FOLDER  # PDFs generated from Telegram uploads
+    image_folder: Path = DEFAULT_IMAGE_FOLDER
+    tesseract_cmd: str = DEFAULT_TESSERACT_CMD
+    warm_up_backends: bool = True  # Import heavy backends in the background once the bot is polling
+    ingest_mode: str = "local"  # "local": this process owns pdf_folder, "shared": several nodes share it
+    node_id: str = ""  # Identifies this process in "shared" ingest mode
+    lease_ttl: float = 60.0  # Seconds without a heartbeat before a node's claimed files are reclaimed
+    ingest_workers: int = 1  # Files processed concurrently by this node in "shared" ingest mode
+    admin_chat_ids: FrozenSet[int] = frozenset()  # Chats allowed to use admin commands such as /queuestats
+    agent_user_ids: FrozenSet[int] = frozenset()  # Users allowed autocomplete without starting a conversation first
+    trace_dir: Optional[Path] = None  # Record anonymized conversation traces here (off when unset)
+    resource_limits: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))  # Read-only
+
+    def __repr__(self) -> str:
+        # Never show secrets in logs or tracebacks
+        secrets = ("telegram_token", "img_ocr_api_key", "monday_api_token")
+        fields = ", ".join(
+            f"{name}={'***' if name in secrets and value else value!r}"
+            for name, value in self.__dict__.items()
+        )
+        return f"Settings({fields})"
+
+
+def load_settings(env_file: Optional[str] = None) -> Settings:
+    """Loads the .env file (if present) and builds a Settings object from the environment."""
+    from dotenv import load_dotenv
+
+    load_dotenv(env_file)
+    return Settings(
+        telegram_token=os.getenv('TELEGRAM_BOT_API'),
+        bot_username=os.getenv('TELEGRAM_BOT_USERNAME'),
+        timezone=os.getenv('TIMEZONE'),
+        timezone_common_name=os.getenv('TIMEZONE_COMMON_NAME'),
+        img_ocr_api_key=os.getenv('IMG_OCR_API_KEY'),
+        monday_api_token=os.getenv('MONDAY_API_TOKEN'),
+        policy_board_id=os.getenv('POLICY_BOARD_ID'),
+        referrer_board_id=os.getenv('REFERRER_BOARD_ID'),
+        insurance_board_id=os.getenv('INSURANCE_BOARD_ID'),
+        service_account_file=os.getenv('SERVICE_ACCOUNT'),
+        ai_model_endpoint=os.getenv('AI_MODEL_ENDPOINT', DEFAULT_AI_MODEL_ENDPOINT),
+        pdf_folder=Path(os.getenv('PDF_FOLDER', DEFAULT_PDF_FOLDER)),
+        telegram_pdf_folder=Path(os.getenv('TELEGRAM_PDF_FOLDER', DEFAULT_TELEGRAM_PDF_FOLDER)),
+        image_folder=Path(os.getenv('IMAGE_FOLDER', DEFAULT_IMAGE_FOLDER)),
+        tesseract_cmd=os.getenv('TESSERACT_CMD', DEFAULT_TESSERACT_CMD),
+        warm_up_backends=_env_bool('WARM_UP_BACKENDS', True),
+        ingest_mode=os.getenv('INGEST_MODE', 'local').strip().lower(),
+        node_id=os.getenv('NODE_ID') or f"{socket.gethostname()}-{os.getpid()}",
+        lease_ttl=float(os.getenv('LEASE_TTL', 60)),
+        ingest_workers=int(os.getenv('INGEST_WORKERS', 1)),
+        admin_chat_ids=_env_ids('ADMIN_CHAT_IDS'),
+        agent_user_ids=_env_ids('AGENT_USER_IDS'),
+        trace_dir=Path(os.environ['TRACE_DIR']) if os.getenv('TRACE_DIR') else None,
+        resource_limits=MappingProxyType({
+            "ocr": int(os.getenv('OCR_CONCURRENCY', 2)),
+            "ai": int(os.getenv('AI_CONCURRENCY', 2)),
+            "monday": int(os.getenv('MONDAY_CONCURRENCY', 2)),
+            "drive": int(os.getenv('DRIVE_CONCURRENCY', 2)),
+        }),
+    )
@@ -0,0 +1 @@
+# Lets the tests import the bot modules (scheduler.py, ingest.py, ...) from the repository root.
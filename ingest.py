@@ -0,0 +1,204 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Prefix this module adds to claimed files: "<time_ns>-<thread id>__"
+CLAIM_TOKEN = re.compile(r"^\d+-\d+__")
+
+
+# Shared folder ingestion: several bot instances watching the same PDF_FOLDER
+class SharedFolderIngester:
+    """
+    Lets several nodes ingest one shared PDF folder without creating duplicate items.
+
+    A node claims a file by renaming it into its own claim directory (.claims/<node_id>/);
+    the rename is atomic, so only one node can win a file. Each node keeps a lease file
+    (.claims/<node_id>.lease) fresh with a heartbeat. When a lease goes stale the node is
+    considered dead and its claimed files are moved back to the folder for others to pick up.
+
+    Right before creating the item, a node checks its lease and then creates a completion
+    marker (.done/<original name>.<content hash>) with O_EXCL. Only the node that creates the
+    marker creates the item, so a file reclaimed mid-flight is never ingested twice. The trade-off:
+    a node that crashes between the marker and the item leaves that document un-ingested.
+    Finished files are moved to processed/.
+
+    Nodes pull one file per worker at a time, and each node scans the folder in its own
+    hash order, so work spreads evenly and nodes rarely race for the same file.
+
+    extract(pdf_path) returns the extracted data (or None); create_item(data, pdf_path) stores it.
+    """
+
+    SETTLE_SECONDS = 2  # Ignore files modified more recently than this (still being written)
+    POLL_SECONDS = 2
+
+    def __init__(self, folder, node_id, lease_ttl, extract, create_item, workers=1):
+        self.folder = Path(folder)
+        self.node_id = node_id
+        self.lease_ttl = lease_ttl
+        self.extract = extract
+        self.create_item = create_item
+        self.workers = max(1, workers)
+        self.claims_root = self.folder / ".claims"
+        self.claim_dir = self.claims_root / node_id
+        self.lease_path = self.claims_root / f"{node_id}.lease"
+        self.done_dir = self.folder / ".done"
+        self.processed_dir = self.folder / "processed"
+
+    def run(self):
+        self.prepare()
+        logger.info(f"Node {self.node_id} ingesting shared folder {self.folder} with {self.workers} worker(s)")
+
+        threading.Thread(target=self._heartbeat, name="ingest-heartbeat", daemon=True).start()
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"ingest-{i}", daemon=True).start()
+
+        while True:
+            self._reclaim_expired()
+            time.sleep(self.lease_ttl / 3)
+
+    def prepare(self):
+        for directory in (self.claim_dir, self.done_dir, self.processed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.lease_path.touch()
+
+        # Files left in our claim directory by a previous run with the same NODE_ID (e.g. a crash)
+        for claimed in self.claim_dir.glob("*.pdf"):
+            logger.warning(f"Returning {claimed.name} left over from a previous run of node {self.node_id}")
+            self._return_to_folder(claimed)
+
+    def _heartbeat(self):
+        while True:
+            try:
+                self.lease_path.touch()
+            except OSError as e:
+                logger.error(f"Failed to renew lease {self.lease_path}: {e}")
+            time.sleep(self.lease_ttl / 3)
+
+    @staticmethod
+    def _original_name(name):
+        # Claimed files are named "<token>__<original name>"; other "__" in a name are kept
+        return CLAIM_TOKEN.sub("", name, count=1)
+
+    def _return_to_folder(self, claimed):
+        try:
+            # Back into the shared folder under its (unique) claim name, so any node can take it
+            os.rename(claimed, self.folder / claimed.name)
+        except FileNotFoundError:
+            pass  # Another node reclaimed it first
+
+    def _reclaim_expired(self):
+        now = time.time()
+        for lease in self.claims_root.glob("*.lease"):
+            node_id = lease.name[:-len(".lease")]
+            if node_id == self.node_id:
+                continue
+            try:
+                if now - lease.stat().st_mtime < self.lease_ttl:
+                    continue
+            except FileNotFoundError:
+                continue
+
+            logger.warning(f"Lease of node {node_id} expired, reclaiming its files")
+            dead_dir = self.claims_root / node_id
+            for claimed in (dead_dir.glob("*.pdf") if dead_dir.is_dir() else []):
+                self._return_to_folder(claimed)
+            for path in (dead_dir, lease):
+                try:
+                    path.rmdir() if path.is_dir() else path.unlink()
+                except OSError:
+                    pass
+
+    def _claim_next(self):
+        now = time.time()
+        candidates = []
+        for entry in os.scandir(self.folder):
+            if not entry.is_file() or not entry.name.endswith('.pdf'):
+                continue
+            try:
+                if now - entry.stat().st_mtime < self.SETTLE_SECONDS:
+                    continue
+            except FileNotFoundError:
+                continue
+            candidates.append(entry.name)
+
+        # Recreate our claim directory in case it was reclaimed while this node was stalled
+        self.claim_dir.mkdir(parents=True, exist_ok=True)
+
+        # Each node walks the files in its own order so nodes don't all race for the same one
+        candidates.sort(key=lambda name: hashlib.sha1(f"{self.node_id}/{name}".encode()).hexdigest())
+        for name in candidates:
+            token = f"{time.time_ns()}-{threading.get_ident()}"
+            claimed = self.claim_dir / f"{token}__{self._original_name(name)}"
+            try:
+                os.rename(self.folder / name, claimed)
+                return claimed
+            except FileNotFoundError:
+                continue  # Claimed by another node
+        return None
+
+    def _worker(self):
+        while True:
+            try:
+                claimed = self._claim_next()
+            except OSError as e:
+                logger.error(f"Failed to scan shared folder {self.folder}: {e}")
+                claimed = None
+            if claimed is None:
+                time.sleep(self.POLL_SECONDS)
+                continue
+            self._process(claimed)
+
+    def _holds_claim(self, claimed):
+        # Our lease must be well inside its TTL, so it can't expire while the item is being created
+        try:
+            lease_age = time.time() - self.lease_path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return claimed.exists() and lease_age < self.lease_ttl / 2
+
+    def _mark_complete(self, claimed):
+        # Completion marker keyed by the original name and content; creating it is the fence
+        digest = hashlib.sha256()
+        with open(claimed, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        marker = self.done_dir / f"{self._original_name(claimed.name)}.{digest.hexdigest()[:16]}"
+        self.done_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{self.node_id} {time.time()}\n")
+        return True
+
+    def _process(self, claimed):
+        logger.info(f"Node {self.node_id} processing file: {claimed}")
+        pdf_path = str(claimed)
+
+        extracted_data = self.extract(pdf_path)
+
+        # If our lease is (nearly) expired the file may be handed to another node; put it back for
+        # whichever node (possibly this one) claims it next, since a renewed lease is never reclaimed
+        if not self._holds_claim(claimed):
+            logger.warning(f"Lost claim on {claimed} before creating the item, returning it to the folder")
+            self._return_to_folder(claimed)
+            return
+
+        if extracted_data:
+            if self._mark_complete(claimed):
+                logger.info(f"Successfully processed {claimed.name}")
+                self.create_item(extracted_data, pdf_path)
+            else:
+                logger.warning(f"{self._original_name(claimed.name)} was already ingested, not creating another item")
+
+        try:
+            os.rename(claimed, self.processed_dir / claimed.name)
+        except FileNotFoundError:
+            logger.warning(f"Lost claim on {claimed} after processing it")
@@ -1,46 +1,61 @@
 import logging
 import threading
-import requests
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, CallbackContext, ConversationHandler
+import importlib
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters, CallbackContext, ConversationHandler
 import os
-from dotenv import load_dotenv
-from PIL import Image  # For image processing
-from PyPDF2 import PdfReader
 import time
 import json
-import pytesseract
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 from datetime import datetime
-from pathlib import Path
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
 import subprocess
 import glob
 import base64
+import asyncio
+from collections import defaultdict
+import hashlib
+import bisect
+import heapq
+import re
+import mimetypes
 import httpx  # Added for verified HTTPS requests
+from config import load_settings
+from scheduler import WorkScheduler, BATCH
+from ingest import SharedFolderIngester
+from tracing import ConversationRecorder
 
-# Explicitly specify the path to tesseract.exe
-pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
+# Heavy backends (requests, PIL, pytesseract, PyPDF2, reportlab, Google API client)
+# are imported inside the functions that use them so the bot can answer /start quickly.
+# httpx is not among them: python-telegram-bot already imports it for its own requests.
 
-# Load environment variables from .env file
-load_dotenv()
+# Load typed settings from the environment / .env file
+settings = load_settings()
 
 # Get the variables
-TOKEN = os.getenv('TELEGRAM_BOT_API')
-MONDAY_API_TOKEN = os.getenv('MONDAY_API_TOKEN')
-POLICY_BOARD_ID = os.getenv('POLICY_BOARD_ID')
-REFERRER_BOARD_ID = os.getenv('REFERRER_BOARD_ID')
-INSURANCE_BOARD_ID = os.getenv('INSURANCE_BOARD_ID')
+TOKEN = settings.telegram_token
+MONDAY_API_TOKEN = settings.monday_api_token
+POLICY_BOARD_ID = settings.policy_board_id
+REFERRER_BOARD_ID = settings.referrer_board_id
+INSURANCE_BOARD_ID = settings.insurance_board_id
 
 # AI model endpoint
-AI_MODEL_ENDPOINT = "http://52.221.236.123:8502/extract-pdf"
+AI_MODEL_ENDPOINT = settings.ai_model_endpoint
 
 # Path to your PDF folder
-PDF_FOLDER = Path.home() / "Projects" / "BingoTelegramBot" / "pdf_folder"
-IMAGE_FOLDER = Path("/Users/carlsaginsin/Projects/BingoTelegramBot/image_folder")  # Added image folder path
+PDF_FOLDER = settings.pdf_folder
+TELEGRAM_PDF_FOLDER = settings.telegram_pdf_folder  # Telegram PDFs live outside the watched PDF_FOLDER
+IMAGE_FOLDER = settings.image_folder  # Added image folder path
+
+# Modules imported by warm_up_backends() once the bot is already polling
+WARM_UP_MODULES = [
+    "requests",
+    "PIL.Image",
+    "pytesseract",
+    "PyPDF2",
+    "reportlab.pdfgen.canvas",
+    "google.oauth2.service_account",
+    "googleapiclient.discovery",
+    "googleapiclient.http",
+]
 
 # Enable logging
 logging.basicConfig(
@@ -73,7 +88,39 @@ CHASSIS_NO = "text775"
 # Update the column ID for the source
 SOURCE_COLUMN_ID = "text04"  # Column ID for "Software Source"
 
+# Google Drive upload settings
+DRIVE_HASH_PROPERTY = "sha256"  # appProperties key holding the file's content hash
+DRIVE_CHUNK_SIZE = 1024 * 1024  # Resumable upload chunk size (must be a multiple of 256 KB)
+DRIVE_UPLOAD_RETRIES = 3
+FILE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF', 'application/pdf'),
+    (b'GIF8', 'image/gif'),
+]
+
+# Autocomplete for the agent fields
+AUTOCOMPLETE_FIELDS = {
+    'agent_name': "Agent Name",
+    'dealership': "Dealership",
+    'agent_contact_info': "Agent Contact Info",
+}
+AUTOCOMPLETE_RESULTS = 10
+AUTOCOMPLETE_PLACEHOLDERS = {'Unknown Agent', 'Unknown Dealership', 'Unknown Contact Info'}
+AUTOCOMPLETE_REFRESH_SECONDS = 600  # How often new referrer board items are pulled in
+
+# Max concurrent calls per external dependency
+RESOURCE_LIMITS = settings.resource_limits
+
+scheduler = WorkScheduler(RESOURCE_LIMITS)
+
+# Opt-in conversation trace recorder (see replay.py); a no-op unless TRACE_DIR is set
+recorder = ConversationRecorder(settings.trace_dir)
+
+@recorder.stage("monday")
 def create_monday_item_from_json(full_name, agent_name, dealership, agent_contact_info, json_data, source, pdf_path=None, folder_link=None):  # Added folder_link parameter
+    import requests
+
     url = 'https://api.monday.com/v2'
     headers = {
         'Authorization': f'Bearer {MONDAY_API_TOKEN}',
@@ -177,6 +224,13 @@ def create_monday_item_from_json(full_name, agent_name, dealership, agent_contac
         return None
 
     logger.info(f"Successfully created item in Referrer board: {referrer_response.json()}")
+
+    # Index the new referrer item for autocomplete now; the board refresh will recognise its ID and skip it
+    autocomplete.add_referrer_item(int(referrer_response.json()['data']['create_item']['id']), {
+        'agent_name': agent_name,
+        'dealership': dealership,
+        'agent_contact_info': agent_contact_info,
+    })
     
     # After creating the item, upload the PDF file to the "Documents Uploaded" column
     if pdf_path:
@@ -254,15 +308,32 @@ def process_log_card(extracted_data, context=None, source="Telegram", pdf_path=N
     except Exception as e:
         logger.error(f"Error processing log card: {e}")
 
+# Folder (WhatsApp) pipeline steps, run at batch priority so live Telegram sessions go first
+def extract_whatsapp_pdf(pdf_path):
+    return scheduler.submit("ai", extract_text_from_pdf, pdf_path, priority=BATCH, key="whatsapp").result()
+
+def ingest_whatsapp_log_card(extracted_data, pdf_path):
+    # Passing None for context when called from monitor_pdf_folder
+    scheduler.submit("monday", process_log_card, extracted_data, context=None, source="WhatsApp", pdf_path=pdf_path, priority=BATCH, key="whatsapp").result()  # Pass pdf_path
+
+
 # Modified call to process_log_card in monitor_pdf_folder to handle None context
 def monitor_pdf_folder():
+    # Ensure the PDF_FOLDER exists
+    PDF_FOLDER.mkdir(parents=True, exist_ok=True)
+
+    # Several nodes sharing the folder: claim files through leases instead of a local set
+    if settings.ingest_mode == "shared":
+        SharedFolderIngester(
+            PDF_FOLDER, settings.node_id, settings.lease_ttl,
+            extract=extract_whatsapp_pdf, create_item=ingest_whatsapp_log_card, workers=settings.ingest_workers
+        ).run()
+        return
+
     processed_files = set()  # Keep track of already processed files
     
     print("Starting to monitor the PDF folder...")  # Debug: Notify that monitoring has started
 
-    # Ensure the PDF_FOLDER exists
-    PDF_FOLDER.mkdir(parents=True, exist_ok=True)
-
     while True:
         # Get the list of all PDF files in the folder
         pdf_files = [f for f in os.listdir(PDF_FOLDER) if f.endswith('.pdf')]
@@ -274,12 +345,11 @@ def monitor_pdf_folder():
                 logger.info(f"Processing file: {pdf_path}")
 
                 # Extract text from the PDF
-                extracted_data = extract_text_from_pdf(pdf_path)
+                extracted_data = extract_whatsapp_pdf(pdf_path)
 
                 if extracted_data:
                     logger.info(f"Successfully processed {pdf_file}")
-                    # Passing None for context when called from monitor_pdf_folder
-                    process_log_card(extracted_data, context=None, source="WhatsApp", pdf_path=pdf_path)  # Pass pdf_path
+                    ingest_whatsapp_log_card(extracted_data, pdf_path)
 
                 # Mark this file as processed
                 processed_files.add(pdf_path)
@@ -289,7 +359,10 @@ def monitor_pdf_folder():
 
 
 # Function to extract text from a PDF using the AI model
+@recorder.stage("ai")
 def extract_text_from_pdf(pdf_path):
+    import requests
+
     try:
         with open(pdf_path, 'rb') as pdf_file:
             files = {'file': (os.path.basename(pdf_path), pdf_file, 'application/pdf')}
@@ -314,6 +387,11 @@ def extract_text_from_pdf(pdf_path):
 
 # Function to extract text from an image using OCR
 def extract_text_from_image(image_path):
+    from PIL import Image  # For image processing
+    import pytesseract
+
+    # Explicitly specify the path to tesseract.exe
+    pytesseract.pytesseract.tesseract_cmd = settings.tesseract_cmd
     try:
         with Image.open(image_path) as image:
             text = pytesseract.image_to_string(image)
@@ -323,7 +401,11 @@ def extract_text_from_image(image_path):
         return None
 
 # Function to create a real PDF with text
+@recorder.stage("pdf")
 def create_pdf_with_text(text, pdf_path):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
     try:
         c = canvas.Canvas(pdf_path, pagesize=letter)
         width, height = letter  # Get the width and height of the page
@@ -348,7 +430,10 @@ def create_pdf_with_text(text, pdf_path):
         logger.error(f"Error creating PDF with text: {e}")
 
 # Function to check if a file is a valid PDF
+@recorder.stage("pdf")
 def is_valid_pdf(file_path):
+    from PyPDF2 import PdfReader
+
     try:
         with open(file_path, "rb") as file:
             reader = PdfReader(file)
@@ -401,24 +486,124 @@ def create_drive_folder(service, folder_name):
     # Return the folder link
     return f"https://drive.google.com/drive/folders/{folder_id}"
 
-# Function to upload a file to Google Drive
-def upload_file_to_drive(service, file_path, folder_id):
+# Drive clients are not thread-safe, so each scheduler worker keeps its own
+_drive_clients = threading.local()
+
+# Function to get this thread's Drive client
+def build_drive_service():
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
+    if getattr(_drive_clients, 'service', None) is None:
+        # Google Drive API setup
+        SCOPES = ['https://www.googleapis.com/auth/drive.file']
+        SERVICE_ACCOUNT_FILE = settings.service_account_file
+        credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+        _drive_clients.service = build('drive', 'v3', credentials=credentials, cache_discovery=False)
+    return _drive_clients.service
+
+# Function to guess a file's MIME type from its contents, falling back to its extension
+def detect_mime_type(file_path):
+    with open(file_path, 'rb') as f:
+        header = f.read(12)
+    for signature, mime_type in FILE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return mimetypes.guess_type(str(file_path))[0] or 'application/octet-stream'
+
+# Function to compute the content hash used to skip duplicate uploads
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to list the content hashes already stored in a Drive folder
+def existing_drive_hashes(service, folder_id):
+    hashes = set()
+    page_token = None
+    while True:
+        response = service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            fields='nextPageToken, files(id, appProperties)',
+            pageToken=page_token
+        ).execute()
+        for file in response.get('files', []):
+            content_hash = (file.get('appProperties') or {}).get(DRIVE_HASH_PROPERTY)
+            if content_hash:
+                hashes.add(content_hash)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return hashes
+
+# Function to upload a file to Google Drive with a resumable, chunked upload
+def upload_file_to_drive(service, file_path, folder_id, content_hash=None):
+    from googleapiclient.http import MediaFileUpload
+
     file_metadata = {
         'name': os.path.basename(file_path),
-        'parents': [folder_id]  # Ensure this is the correct folder ID
+        'parents': [folder_id],  # Ensure this is the correct folder ID
+        'appProperties': {DRIVE_HASH_PROPERTY: content_hash or file_sha256(file_path)}
     }
-    media = MediaFileUpload(file_path, mimetype='image/jpeg')  # Adjust MIME type if necessary
-    file = service.files().create(body=file_metadata, media_body=media, fields='id').execute()
-    logger.info(f"Uploaded file to Google Drive with ID: {file.get('id')}")
+    media = MediaFileUpload(str(file_path), mimetype=detect_mime_type(file_path), chunksize=DRIVE_CHUNK_SIZE, resumable=True)
+    request = service.files().create(body=file_metadata, media_body=media, fields='id')
+
+    # Send the file chunk by chunk; each chunk is retried on its own after a network error
+    response = None
+    while response is None:
+        _, response = request.next_chunk(num_retries=DRIVE_UPLOAD_RETRIES)
+    logger.info(f"Uploaded file to Google Drive with ID: {response.get('id')}")
+    return response.get('id')
+
+# Function to find (or create) the user's Drive folder and work out which files still need uploading
+@recorder.stage("drive")
+def prepare_drive_archive(file_paths, user_full_name):
+    service = build_drive_service()
+
+    # Create a folder for the user only if it doesn't exist
+    folder_link = create_drive_folder(service, user_full_name)
+    folder_id = folder_link.split('/')[-1]
+
+    # Skip files whose content is already in the folder (e.g. a re-sent photo)
+    existing_hashes = existing_drive_hashes(service, folder_id)
+    pending = {}
+    for file_path in file_paths:
+        content_hash = file_sha256(file_path)
+        if content_hash in existing_hashes or content_hash in pending.values():
+            logger.info(f"Skipping duplicate Drive upload for {file_path}")
+            continue
+        pending[str(file_path)] = content_hash
+    return folder_link, pending
+
+# Function to upload one of a session's files to the user's Drive folder
+@recorder.stage("drive")
+def upload_session_file(file_path, folder_id, content_hash):
+    return upload_file_to_drive(build_drive_service(), file_path, folder_id, content_hash)
+
+# Function to archive all of a session's files in the user's Drive folder and return the folder link
+async def archive_session_to_drive(file_paths, user_full_name, key):
+    folder_link, pending = await scheduler.run("drive", prepare_drive_archive, file_paths, user_full_name, key=key)
+    folder_id = folder_link.split('/')[-1]
+
+    # Each upload is its own "drive" job, so they run concurrently up to the Drive limit
+    await asyncio.gather(*(
+        scheduler.run("drive", upload_session_file, file_path, folder_id, content_hash, key=key)
+        for file_path, content_hash in pending.items()
+    ))
+    return folder_link
 
 # Function to extract text from an image using ImgOCR API
+@recorder.stage("ocr")
 def extract_text_from_image_ocr(image_path):
     try:
         with open(image_path, 'rb') as image_file:
             file_data = base64.b64encode(image_file.read()).decode('utf-8')
         
         post_data = {
-            'api_key': os.getenv('IMG_OCR_API_KEY'),  # Use the API key from the .env file
+            'api_key': settings.img_ocr_api_key,  # Use the API key from the .env file
             'image': file_data
         }
         
@@ -434,25 +619,138 @@ def extract_text_from_image_ocr(image_path):
         logger.error(f"Error during ImgOCR text extraction for {image_path}: {e}")
         return None
 
+# Status message that is edited in place as an upload goes through the pipeline
+class ProgressReporter:
+    """
+    Posts one status message per upload and edits it as stages finish.
+
+    Edits are throttled to one per MIN_EDIT_INTERVAL seconds to stay within Telegram's rate
+    limits; updates arriving in between are merged into a single delayed edit.
+    """
+
+    MIN_EDIT_INTERVAL = 1.5
+
+    def __init__(self, title, stages):
+        self.title = title
+        self.stages = stages  # [(stage key, label)]
+        self.done = set()
+        self.failed = set()
+        self.footer = ""
+        self.message = None
+        self.last_edit = 0.0
+        self.shown_text = None
+        self.pending = None  # Delayed edit task
+
+    def render(self):
+        lines = [self.title]
+        for key, label in self.stages:
+            mark = '✅' if key in self.done else '⚠️' if key in self.failed else '⏳'
+            lines.append(f"{mark} {label}")
+        if self.footer:
+            lines.append("")
+            lines.append(self.footer)
+        return "\n".join(lines)
+
+    async def start(self, message):
+        self.shown_text = self.render()
+        self.message = await message.reply_text(self.shown_text)
+        self.last_edit = time.monotonic()
+
+    async def advance(self, stage):
+        self.done.add(stage)
+        await self._edit()
+
+    async def mark_failed(self, stage):
+        # The pipeline carries on, but this stage didn't produce anything
+        self.failed.add(stage)
+        await self._edit()
+
+    async def finish(self, footer=""):
+        self.footer = footer
+        await self._edit()
+
+    async def fail(self, error):
+        self.footer = f"❌ {error}"
+        await self._edit()
+
+    async def _edit(self):
+        if self.message is None:
+            return
+        wait = self.last_edit + self.MIN_EDIT_INTERVAL - time.monotonic()
+        if wait > 0:
+            # Too soon; a delayed edit will send whatever the latest state is by then
+            if self.pending is None or self.pending.done():
+                self.pending = asyncio.create_task(self._delayed_edit(wait))
+            return
+        await self._send()
+
+    async def _delayed_edit(self, wait):
+        await asyncio.sleep(wait)
+        await self._send()
+
+    async def _send(self):
+        text = self.render()
+        if text == self.shown_text:
+            return
+        try:
+            await self.message.edit_text(text)
+            self.shown_text = text
+        except Exception as e:
+            logger.warning(f"Failed to update progress message: {e}")
+        self.last_edit = time.monotonic()
+
+
+# Function to list the fields the AI model extracted, for the upload summary
+def summarize_extracted_fields(extracted_data):
+    content = (extracted_data or {}).get("content", "").strip()
+    if content.startswith("```json"):
+        content = content.strip("```json").strip()
+    try:
+        fields = json.loads(content)
+    except ValueError:
+        return ""
+    if not isinstance(fields, dict):
+        return ""
+    return "\n".join(f"{name.replace('_', ' ')}: {value}" for name, value in fields.items() if value)
+
+
 # Update the handle_upload function to extract text using ImgOCR
 async def handle_upload(update: Update, context: CallbackContext, upload_type: str) -> int:
+    # Each chat gets its own fair share of the scheduler
+    chat_key = f"chat:{update.effective_chat.id}"
+
+    # The documents are archived to Drive together with the last upload of the session
+    last_upload = all(done for name, done in context.user_data['uploads'].items() if name != upload_type)
+    stages = [('downloaded', "Downloaded"), ('ocr', "Text recognised"), ('extracted', "Fields extracted")]
+    if last_upload:
+        stages.append(('archived', "Archived to Drive"))
+    progress = ProgressReporter(f"Processing your {upload_type.replace('_', ' ')}…", stages)
+
     try:
+        await progress.start(update.message)
+
         # Get the highest resolution image from the user's upload
         photo = update.message.photo[-1]
         photo_file = await photo.get_file()
 
-        # Define the name for the image based on the upload type
+        # Define the name for the image based on the upload type, in a folder of its own per chat
+        # so another chat uploading the same document type can't overwrite it before it's archived
         image_name = f"{upload_type.replace('_', ' ').title()}.jpg"
-        image_path = IMAGE_FOLDER / image_name
+        chat_image_folder = IMAGE_FOLDER / str(update.effective_chat.id)
+        chat_image_folder.mkdir(parents=True, exist_ok=True)
+        image_path = chat_image_folder / image_name
 
         # Download the image file to the local file system
         await photo_file.download_to_drive(image_path)
+        await progress.advance('downloaded')
 
         # Extract text from the image using ImgOCR
-        extracted_text = extract_text_from_image_ocr(image_path)
+        extracted_text = await scheduler.run("ocr", extract_text_from_image_ocr, image_path, key=chat_key)
 
-        # Define the path where the PDF will be saved
-        pdf_path = os.path.join(PDF_FOLDER, f"{upload_type.replace('_', ' ').title()}.pdf")
+        # Define the path where the PDF will be saved (not in PDF_FOLDER, which the folder watcher ingests)
+        chat_pdf_folder = TELEGRAM_PDF_FOLDER / str(update.effective_chat.id)
+        chat_pdf_folder.mkdir(parents=True, exist_ok=True)
+        pdf_path = os.path.join(chat_pdf_folder, f"{upload_type.replace('_', ' ').title()}.pdf")
 
         if extracted_text and extracted_text.strip():
             # Create a real PDF with the extracted text
@@ -463,9 +761,10 @@ async def handle_upload(update: Update, context: CallbackContext, upload_type: s
         # Validate if the PDF file is correct
         if not is_valid_pdf(pdf_path):
             raise ValueError(f"The generated file at {pdf_path} is not a valid PDF.")
+        await progress.advance('ocr')
 
         # Send the PDF to the AI model for further processing
-        extracted_data = extract_text_from_pdf(pdf_path)
+        extracted_data = await scheduler.run("ai", extract_text_from_pdf, pdf_path, key=chat_key)
         if extracted_data:
             logger.info(f"Extracted text from PDF: {json.dumps(extracted_data, indent=4)}")
 
@@ -473,33 +772,38 @@ async def handle_upload(update: Update, context: CallbackContext, upload_type: s
             if upload_type == 'log_card':
                 context.user_data['extracted_data'] = extracted_data  # Store extracted data for later use
 
+            await progress.advance('extracted')
         else:
             logger.error("AI model could not extract text from the PDF.")
+            await progress.mark_failed('extracted')
 
         # Mark the upload as done
         context.user_data['uploads'][upload_type] = True
+        context.user_data.setdefault('session_files', {})[upload_type] = image_path
 
-        # Google Drive API setup
-        SCOPES = ['https://www.googleapis.com/auth/drive.file']
-        SERVICE_ACCOUNT_FILE = os.getenv('SERVICE_ACCOUNT')
-        credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        service = build('drive', 'v3', credentials=credentials)
-
-        # Create a folder for the user based on their full name only if it doesn't exist
-        user_full_name = context.user_data.get('full_name', 'Unknown_User')
-        folder_link = create_drive_folder(service, user_full_name)  # Create folder and get link
-
-        # Upload the image to the created folder
-        upload_file_to_drive(service, image_path, folder_link.split('/')[-1])  # Ensure this uses the correct folder ID
-
-        # Store the folder link in user data for later use
-        context.user_data['folder_link'] = folder_link
+        # Check if all uploads are done
+        all_uploaded = all(context.user_data['uploads'].values())
+        if all_uploaded:
+            # Archive all of the session's documents in the user's Drive folder in one go
+            user_full_name = context.user_data.get('full_name', 'Unknown_User')
+            session_files = list(context.user_data['session_files'].values())
+            folder_link = await archive_session_to_drive(session_files, user_full_name, key=chat_key)
+            await progress.advance('archived')
+
+            # Store the folder link in user data for later use
+            context.user_data['folder_link'] = folder_link
+
+        # Final summary of what was extracted
+        if not extracted_data:
+            await progress.finish("⚠️ The fields could not be extracted from this document.")
+        else:
+            summary = summarize_extracted_fields(extracted_data)
+            await progress.finish(f"Extracted fields:\n{summary}" if summary else "No fields were found in this document.")
 
         # Send a thank you message to the user
         await update.message.reply_text(f"Thank you for uploading your {upload_type.replace('_', ' ')}.")
 
-        # Check if all uploads are done
-        if all(context.user_data['uploads'].values()):
+        if all_uploaded:
             await show_additional_buttons(update, context)
             logger.info("All uploads completed. Transitioning to additional information input.")
             return CHOOSING
@@ -508,18 +812,10 @@ async def handle_upload(update: Update, context: CallbackContext, upload_type: s
 
     except Exception as e:
         logger.error(f"Error processing image: {e}")
+        await progress.fail("Processing failed")
         await update.message.reply_text(f"Failed to process image. Error: {str(e)}")
         return CHOOSING
 
-def upload_file_to_drive(service, file_path, folder_id):
-    file_metadata = {
-        'name': os.path.basename(file_path),
-        'parents': [folder_id]  # Ensure this is the correct folder ID
-    }
-    media = MediaFileUpload(file_path, mimetype='image/jpeg')  # Adjust MIME type if necessary
-    file = service.files().create(body=file_metadata, media_body=media, fields='id').execute()
-    logger.info(f"Uploaded file to Google Drive with ID: {file.get('id')}")
-
 # Function to show additional buttons for further information
 async def show_additional_buttons(update: Update, context: CallbackContext) -> int:
     keyboard = [
@@ -558,12 +854,16 @@ async def additional_button_click(update: Update, context: CallbackContext) -> i
 
     return CHOOSING  # If no valid selection, remain in CHOOSING state
 
+@recorder.handler
 async def start(update: Update, context: CallbackContext) -> int:
+    # Agents who have used the bot may get autocomplete suggestions (see inline_autocomplete)
+    context.user_data['started'] = True
     await update.message.reply_text("Welcome! Please enter the policy holder's full name:")
     return ASKING_NAME
 
 
 # Handler to process the user's name and proceed with the welcome message
+@recorder.handler
 async def ask_name(update: Update, context: CallbackContext) -> int:
     full_name = update.message.text
     context.user_data['full_name'] = full_name
@@ -617,32 +917,249 @@ async def show_additional_buttons(update: Update, context: CallbackContext) -> i
         [InlineKeyboardButton("Agent Contact Info", callback_data='agent_contact_info')]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Please provide the following information:", reply_markup=reply_markup)
+    await update.effective_message.reply_text("Please provide the following information:", reply_markup=reply_markup)
     return CHOOSING  # Updated to CHOOSING
 
 
 # Function to handle the click on additional buttons and transition to the correct state for text input
+@recorder.handler
 async def additional_button_click(update: Update, context: CallbackContext) -> int:
     query = update.callback_query
     await query.answer()
 
     if query.data == 'agent_name':
         # Ask for Agent Name input and move to the AGENT_NAME_INPUT state
-        await query.edit_message_text(text="Please enter the Agent Name:")
+        await query.edit_message_text(text="Please enter the Agent Name:", reply_markup=field_prompt_markup(context, 'agent_name'))
         return AGENT_NAME_INPUT
     elif query.data == 'dealership':
         # Ask for Dealership input and move to the DEALERSHIP_INPUT state
-        await query.edit_message_text(text="Please enter the Dealership:")
+        await query.edit_message_text(text="Please enter the Dealership:", reply_markup=field_prompt_markup(context, 'dealership'))
         return DEALERSHIP_INPUT
     elif query.data == 'agent_contact_info':
         # Ask for Agent Contact Info and move to the CONTACT_INFO_INPUT state
-        await query.edit_message_text(text="Please enter the Agent Contact Info:")
+        await query.edit_message_text(text="Please enter the Agent Contact Info:", reply_markup=field_prompt_markup(context, 'agent_contact_info'))
         return CONTACT_INFO_INPUT
 
     return CHOOSING  # If no valid selection, remain in CHOOSING state
 
 
+# In-memory prefix index for one autocomplete field
+class PrefixIndex:
+    """
+    Sorted list of normalized keys searched with bisect, so a lookup only touches matching keys.
+
+    Every word of a value is indexed ("ABC Motors" is found by "abc" and "mot"), and different
+    spellings of the same value are grouped; suggestions use the most common spelling.
+    """
+
+    def __init__(self, normalize):
+        self.normalize = normalize
+        self.keys = []  # sorted (search key, normalized value)
+        self.spellings = defaultdict(lambda: defaultdict(int))  # normalized value -> spelling -> count
+        self.counts = defaultdict(int)  # normalized value -> times seen
+
+    def add(self, value):
+        value = (value or "").strip()
+        normalized = self.normalize(value)
+        if not normalized:
+            return
+        if normalized not in self.spellings:
+            words = normalized.split(" ")
+            for i in range(len(words)):
+                entry = (" ".join(words[i:]), normalized)
+                position = bisect.bisect_left(self.keys, entry)
+                if position == len(self.keys) or self.keys[position] != entry:
+                    self.keys.insert(position, entry)
+        self.spellings[normalized][value] += 1
+        self.counts[normalized] += 1
+
+    def _best(self, normalized):
+        spellings = self.spellings[normalized]
+        return max(spellings, key=spellings.get)
+
+    def search(self, prefix, limit=AUTOCOMPLETE_RESULTS):
+        normalized_prefix = self.normalize(prefix)
+        if prefix.strip() and not normalized_prefix:
+            # Typed text with nothing this field can match (e.g. letters for a phone number)
+            return []
+        prefix = normalized_prefix
+        if prefix:
+            matches = set()
+            position = bisect.bisect_left(self.keys, (prefix, ""))
+            while position < len(self.keys) and self.keys[position][0].startswith(prefix):
+                matches.add(self.keys[position][1])
+                position += 1
+        else:
+            matches = self.counts
+        # Most used values first
+        ranked = heapq.nlargest(limit, matches, key=self.counts.get)
+        return [self._best(normalized) for normalized in ranked]
+
+
+def normalize_text(value):
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+def normalize_phone(value):
+    return re.sub(r"[^\d+]", "", value)
+
+
+# Autocomplete suggestions for the agent fields, served without calling Monday.com
+class AutocompleteIndex:
+    def __init__(self):
+        self.fields = {
+            'agent_name': PrefixIndex(normalize_text),
+            'dealership': PrefixIndex(normalize_text),
+            'agent_contact_info': PrefixIndex(normalize_phone),
+        }
+        self.seen_item_ids = set()  # Referrer board items already indexed
+        self.refreshed_up_to = None  # Newest item ID covered by a completed board refresh
+        self.lock = threading.Lock()
+
+    def add_referrer_item(self, item_id, values):
+        """Indexes one referrer board item unless it's already indexed; returns whether it was added."""
+        with self.lock:
+            if item_id in self.seen_item_ids:
+                return False
+            self.seen_item_ids.add(item_id)
+            for field, value in values.items():
+                # Skip the placeholders process_log_card uses when there is no Telegram context
+                if field in self.fields and value and value not in AUTOCOMPLETE_PLACEHOLDERS:
+                    self.fields[field].add(value)
+            return True
+
+    def search(self, field, prefix):
+        with self.lock:
+            return self.fields[field].search(prefix)
+
+    def refresh_from_referrer_board(self):
+        """
+        Adds referrer board items that aren't indexed yet; returns how many were added.
+
+        Items are paged newest first. The first refresh reads the whole board; later ones
+        stop at the newest item a previous refresh already covered.
+        """
+        import requests
+
+        url = 'https://api.monday.com/v2'
+        headers = {
+            'Authorization': f'Bearer {MONDAY_API_TOKEN}',
+            'Content-Type': 'application/json'
+        }
+        items_fields = 'cursor items { id column_values(ids: ["text", "phone", "text4"]) { id text } }'
+        newest_first = '{order_by: [{column_id: "__creation_log__", direction: desc}]}'
+        query = f'query {{ boards(ids: {REFERRER_BOARD_ID}) {{ items_page(limit: 100, query_params: {newest_first}) {{ {items_fields} }} }} }}'
+        added = 0
+        newest_id = None
+
+        while True:
+            response = requests.post(url, headers=headers, json={'query': query})
+            if response.status_code != 200 or 'errors' in response.json():
+                logger.error(f"Failed to load referrer board for autocomplete: {response.text}")
+                return added
+
+            data = response.json()['data']
+            page = data['next_items_page'] if 'next_items_page' in data else data['boards'][0]['items_page']
+            for item in page['items']:
+                item_id = int(item['id'])
+                newest_id = max(newest_id or item_id, item_id)
+                if self.refreshed_up_to is not None and item_id <= self.refreshed_up_to:
+                    # Everything from here on was covered by an earlier refresh
+                    self.refreshed_up_to = newest_id
+                    return added
+                columns = {column['id']: column['text'] for column in item['column_values']}
+                if self.add_referrer_item(item_id, {
+                    'agent_name': columns.get('text'),
+                    'agent_contact_info': columns.get('phone'),
+                    'dealership': columns.get('text4'),
+                }):
+                    added += 1
+
+            if not page['cursor']:
+                if newest_id is not None:
+                    self.refreshed_up_to = max(self.refreshed_up_to or newest_id, newest_id)
+                return added
+            query = f'query {{ next_items_page(limit: 100, cursor: "{page["cursor"]}") {{ {items_fields} }} }}'
+
+
+autocomplete = AutocompleteIndex()
+
+# Keep the autocomplete index up to date with the referrer board
+def refresh_autocomplete_index():
+    while True:
+        try:
+            added = scheduler.submit("monday", autocomplete.refresh_from_referrer_board, priority=BATCH, key="autocomplete").result()
+            logger.info(f"Autocomplete index refreshed, {added} new referrer item(s)")
+        except Exception as e:
+            logger.error(f"Failed to refresh autocomplete index: {e}")
+        time.sleep(AUTOCOMPLETE_REFRESH_SECONDS)
+
+# Buttons shown with a field prompt: one tap for the last-used value, or search saved values
+def field_prompt_markup(context, field):
+    keyboard = []
+    last_used = context.user_data.get('last_used', {}).get(field)
+    if last_used:
+        keyboard.append([InlineKeyboardButton(f"Use {last_used}", callback_data=f'use_last:{field}')])
+    keyboard.append([InlineKeyboardButton("Search saved values", switch_inline_query_current_chat=f"{field}: ")])
+    return InlineKeyboardMarkup(keyboard)
+
+# Answer inline queries like "dealership: abc" from the local index
+async def inline_autocomplete(update: Update, context: CallbackContext) -> None:
+    # Inline queries can come from anyone on Telegram; only agents may see the referrer data
+    user_id = update.inline_query.from_user.id
+    if not context.user_data.get('started') and user_id not in settings.agent_user_ids:
+        await update.inline_query.answer([], cache_time=0, is_personal=True)
+        return
+
+    text = update.inline_query.query
+    field, separator, prefix = text.partition(":")
+    field = field.strip()
+    if not separator or field not in AUTOCOMPLETE_FIELDS:
+        # No field given: search every field
+        fields, prefix = list(AUTOCOMPLETE_FIELDS), text
+    else:
+        fields = [field]
+
+    suggestions = []
+    for name in fields:
+        last_used = context.user_data.get('last_used', {}).get(name)
+        if last_used and not prefix.strip():
+            suggestions.append((name, last_used))
+        suggestions.extend((name, value) for value in autocomplete.search(name, prefix) if value != last_used)
+
+    results = [
+        InlineQueryResultArticle(
+            id=str(i),
+            title=value,
+            description=AUTOCOMPLETE_FIELDS[name],
+            input_message_content=InputTextMessageContent(value)
+        )
+        for i, (name, value) in enumerate(suggestions[:AUTOCOMPLETE_RESULTS])
+    ]
+    await update.inline_query.answer(results, cache_time=0, is_personal=True)
+
+# Handle the "Use <last value>" button of a field prompt
+@recorder.handler
+async def use_last_value(update: Update, context: CallbackContext) -> int:
+    query = update.callback_query
+    await query.answer()
+
+    field = query.data.split(":", 1)[1]
+    value = context.user_data.get('last_used', {}).get(field)
+    if not value:
+        await query.edit_message_text(text=f"Please enter the {AUTOCOMPLETE_FIELDS[field]}:")
+        return {'agent_name': AGENT_NAME_INPUT, 'dealership': DEALERSHIP_INPUT}.get(field, CONTACT_INFO_INPUT)
+
+    context.user_data[field] = value
+    await query.edit_message_text(text=f"{AUTOCOMPLETE_FIELDS[field]} saved: {value}")
+    if field == 'agent_contact_info':
+        # Once all info is entered, ask for confirmation
+        return await ask_for_confirmation(update, context)
+    # Go back to additional button options
+    return await show_additional_buttons(update, context)
+
 # Handle input for Agent Name
+@recorder.handler
 async def agent_name_input(update: Update, context: CallbackContext) -> int:
     context.user_data['agent_name'] = update.message.text
     await update.message.reply_text(f"Agent Name saved: {update.message.text}")
@@ -651,6 +1168,7 @@ async def agent_name_input(update: Update, context: CallbackContext) -> int:
     return CHOOSING
 
 # Handle input for Dealership
+@recorder.handler
 async def dealership_input(update: Update, context: CallbackContext) -> int:
     context.user_data['dealership'] = update.message.text
     await update.message.reply_text(f"Dealership saved: {update.message.text}")
@@ -659,6 +1177,7 @@ async def dealership_input(update: Update, context: CallbackContext) -> int:
     return CHOOSING
 
 # Handle input for Agent Contact Info
+@recorder.handler
 async def contact_info_input(update: Update, context: CallbackContext) -> int:
     context.user_data['agent_contact_info'] = update.message.text
     await update.message.reply_text(f"Agent Contact Info saved: {update.message.text}")
@@ -672,12 +1191,13 @@ async def ask_for_confirmation(update: Update, context: CallbackContext) -> int:
         "By replying YES, I confirm that I have informed the client that their information "
         "will be collected and used to generate an insurance quote."
     )
-    await update.message.reply_text(confirmation_message)
+    await update.effective_message.reply_text(confirmation_message)
     return CONFIRMATION
 
 
 
 # Handle the user's response to the confirmation message
+@recorder.handler
 async def handle_confirmation(update: Update, context: CallbackContext) -> int:
     if update.message.text.strip().lower() == "yes":
         # If confirmed, process and store the data in Monday.com
@@ -685,7 +1205,11 @@ async def handle_confirmation(update: Update, context: CallbackContext) -> int:
         agent_name = context.user_data.get('agent_name', 'Unknown Agent')  # Get the agent name
         folder_link = context.user_data.get('folder_link', None)  # Get the folder link
         if extracted_data:
-            process_log_card(extracted_data, context, source="Telegram", folder_link=folder_link)  # Pass folder_link
+            await scheduler.run("monday", process_log_card, extracted_data, context, source="Telegram", folder_link=folder_link, key=f"chat:{update.effective_chat.id}")  # Pass folder_link
+
+            # Remember the agent fields for one-tap reuse next time (the referrer item created above
+            # already added them to the autocomplete index)
+            context.user_data['last_used'] = {field: context.user_data.get(field) for field in AUTOCOMPLETE_FIELDS if context.user_data.get(field)}
             await update.message.reply_text(f"Data has been successfully stored in Monday.com for Agent: {agent_name}.")  # Include agent name
             
             # Gather image paths from the image folder
@@ -702,12 +1226,27 @@ async def handle_confirmation(update: Update, context: CallbackContext) -> int:
 
     return ConversationHandler.END
 
+# Report scheduler queue wait times (outside the conversation, admins only)
+async def queue_stats(update: Update, context: CallbackContext) -> None:
+    if update.effective_chat.id not in settings.admin_chat_ids:
+        logger.warning(f"Ignoring /queuestats from non-admin chat {update.effective_chat.id}")
+        return
+
+    lines = []
+    for name, stats in scheduler.wait_stats().items():
+        lines.append(
+            f"{name}: queued={stats['queued']} samples={stats['samples']} "
+            f"p50={stats['p50']:.2f}s p95={stats['p95']:.2f}s max={stats['max']:.2f}s"
+        )
+    await update.message.reply_text("\n".join(lines))
+
 # Function to show the upload buttons again
 async def show_upload_buttons(update: Update, context: CallbackContext) -> int:
     await show_remaining_buttons(update, context)
     return CHOOSING
 
 # Handle the click on upload buttons
+@recorder.handler
 async def upload_button_click(update: Update, context: CallbackContext) -> int:
     query = update.callback_query
     await query.answer()
@@ -726,21 +1265,39 @@ async def upload_button_click(update: Update, context: CallbackContext) -> int:
     return CHOOSING
 
 # Handle the upload of the driver's license
+@recorder.handler
 async def license_upload(update: Update, context: CallbackContext) -> int:
     return await handle_upload(update, context, upload_type='driver_license')
 
 # Handle the upload of the identity card
+@recorder.handler
 async def identity_card_upload(update: Update, context: CallbackContext) -> int:
     return await handle_upload(update, context, upload_type='identity_card')
 
 # Handle the upload of the log card
+@recorder.handler
 async def log_card_upload(update: Update, context: CallbackContext) -> int:
     return await handle_upload(update, context, upload_type='log_card')
 
 
+# Import the heavy backends ahead of the first upload so it doesn't pay the import cost
+def warm_up_backends():
+    started = time.perf_counter()
+    for module_name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Could not warm up {module_name}: {e}")
+    logger.info(f"Backends warmed up in {time.perf_counter() - started:.2f}s")
+
+# Runs once the application is initialised, right before polling starts
+async def post_init(application: Application) -> None:
+    if settings.warm_up_backends:
+        threading.Thread(target=warm_up_backends, name="warm-up", daemon=True).start()
+
 # Main function to run the bot
 def main():
-    application = Application.builder().token(TOKEN).build()
+    application = Application.builder().token(TOKEN).post_init(post_init).build()
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],  # Ensure `start` is properly defined
@@ -753,19 +1310,37 @@ def main():
             UPLOAD_DRIVER_LICENSE: [MessageHandler(filters.PHOTO, license_upload)],
             UPLOAD_IDENTITY_CARD: [MessageHandler(filters.PHOTO, identity_card_upload)],
             UPLOAD_LOG_CARD: [MessageHandler(filters.PHOTO, log_card_upload)],
-            AGENT_NAME_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, agent_name_input)],
-            DEALERSHIP_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, dealership_input)],
-            CONTACT_INFO_INPUT: [MessageHandler(filters.TEXT & ~filters.COMMAND, contact_info_input)],
+            AGENT_NAME_INPUT: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, agent_name_input),
+                CallbackQueryHandler(use_last_value, pattern='^use_last:')
+            ],
+            DEALERSHIP_INPUT: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, dealership_input),
+                CallbackQueryHandler(use_last_value, pattern='^use_last:')
+            ],
+            CONTACT_INFO_INPUT: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, contact_info_input),
+                CallbackQueryHandler(use_last_value, pattern='^use_last:')
+            ],
             CONFIRMATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_confirmation)],
         },
         fallbacks=[]
     )
 
     application.add_handler(conv_handler)
+    application.add_handler(CommandHandler("queuestats", queue_stats))
+    # Inline-query autocomplete for the agent fields (inline mode must be enabled in BotFather)
+    application.add_handler(InlineQueryHandler(inline_autocomplete))
+
+    # Start the shared work scheduler before any pipeline submits to it
+    scheduler.start()
 
     # Start the PDF monitoring in a separate thread
     threading.Thread(target=monitor_pdf_folder, daemon=True).start()
 
+    # Build and keep refreshing the autocomplete index from the referrer board
+    threading.Thread(target=refresh_autocomplete_index, daemon=True).start()
+
     # Start the bot's polling in the main thread
     application.run_polling()
 
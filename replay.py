@@ -0,0 +1,440 @@
+"""
+Replay recorded conversation traces offline with a profiler attached.
+
+Traces are recorded by the bot when TRACE_DIR is set (see tracing.py). Replaying runs the real
+handlers, scheduler and local PDF steps; the external services (ImgOCR, the AI model, Google Drive,
+Monday.com) are replaced by local stand-ins that wait as long as the recorded call took and return
+a placeholder payload with the recorded shape.
+
+Usage:
+    python replay.py run traces/*.jsonl --out report.json                  # sampling profiler
+    python replay.py run trace.jsonl --profiler cprofile --out report.json
+    python replay.py run trace.jsonl --focus handle_upload --no-latency
+    python replay.py compare old_report.json new_report.json
+
+"run" writes report.json (stage and handler timings), report.folded (collapsed stacks) and
+report.svg (flame graph); with --profiler cprofile the stacks are rebuilt from the call graph and
+report.pstats is written as well. To compare two code versions, run the same traces at each version and
+compare the two reports.
+"""
+import argparse
+import asyncio
+import cProfile
+import dataclasses
+import html
+import json
+import os
+import pstats
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+
+from tracing import load_trace
+
+# Stages that talk to external services and are replaced by stand-ins during replay
+EXTERNAL_STAGES = {"ocr", "ai", "drive", "monday"}
+
+
+# Builds a placeholder value with the same shape as a recorded payload
+def synthesize(shape):
+    if shape is None or shape == "...":
+        return None
+    if shape == "bool":
+        return True
+    if shape == "int":
+        return 0
+    if shape == "float":
+        return 0.0
+    if isinstance(shape, dict):
+        if "str" in shape:
+            return "x" * shape["str"]
+        if "json" in shape:
+            return json.dumps(synthesize(shape["json"]))
+        if "dict" in shape:
+            return {key: synthesize(value) for key, value in shape["dict"].items()}
+        if "mapping" in shape:
+            # Unique keys of the recorded length; the "/" keeps them from looking like field names
+            key_length = shape["key"].get("str", 0) if isinstance(shape["key"], dict) else 0
+            return {f"/{i}".rjust(key_length, "x"): synthesize(shape["value"]) for i in range(shape["mapping"])}
+        if "tuple" in shape:
+            return tuple(synthesize(item) for item in shape["tuple"])
+        if "list" in shape:
+            return [synthesize(shape["item"]) for _ in range(shape["list"])]
+    return None
+
+
+# Stand-in Telegram objects, just enough for the conversation handlers
+class _Chat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class _File:
+    def __init__(self, size):
+        self.size = size or 1024
+
+    async def download_to_drive(self, path):
+        with open(path, 'wb') as f:
+            f.write(b'\xff\xd8\xff' + b'\0' * max(0, self.size - 3))
+
+
+class _Photo:
+    def __init__(self, shape):
+        self.width = shape.get("width")
+        self.height = shape.get("height")
+        self.file_size = shape.get("file_size")
+
+    async def get_file(self):
+        return _File(self.file_size)
+
+
+class _Message:
+    def __init__(self, text=None, photo=()):
+        self.text = text
+        self.photo = photo
+
+    async def reply_text(self, text, **kwargs):
+        return _Message(text=text)
+
+    async def edit_text(self, text, **kwargs):
+        return self
+
+
+class _CallbackQuery:
+    def __init__(self, data):
+        self.data = data
+        self.message = _Message()
+
+    async def answer(self, *args, **kwargs):
+        return True
+
+    async def edit_message_text(self, text=None, **kwargs):
+        return self.message
+
+
+class _Update:
+    def __init__(self, shape, chat_id):
+        self.effective_chat = _Chat(chat_id)
+        self.callback_query = None
+        self.message = None
+        kind = shape.get("kind")
+        if kind == "callback":
+            self.callback_query = _CallbackQuery(shape.get("data"))
+        elif kind == "photo":
+            self.message = _Message(photo=(_Photo(shape),))
+        elif kind == "command":
+            self.message = _Message(text=shape.get("command", "/start"))
+        else:
+            self.message = _Message(text="yes" if shape.get("is_yes") else "x" * shape.get("length", 1))
+
+    @property
+    def effective_message(self):
+        return self.callback_query.message if self.callback_query else self.message
+
+
+class _Context:
+    def __init__(self):
+        self.user_data = {}
+
+
+# Installs stand-ins for every external stage of the bot, fed by the calls recorded in the traces.
+# Fails closed: a stage with no recorded call left raises instead of reaching the real service.
+def install_stand_ins(main, events, latency):
+    recorded = defaultdict(deque)  # function name -> recorded calls, in order
+    for event in events:
+        if event["type"] == "call" and event["stage"] in EXTERNAL_STAGES:
+            recorded[event["function"]].append(event)
+
+    stages = {name: stage for name, stage in main.recorder.stages.items() if stage in EXTERNAL_STAGES}
+    for function_name, stage in stages.items():
+        def stand_in(*args, _calls=recorded[function_name], _name=function_name, **kwargs):
+            if not _calls:
+                raise RuntimeError(f"No recorded {_name} call left to replay")
+            call = _calls.popleft()
+            if latency:
+                time.sleep(call["duration"])
+            if not call["ok"]:
+                raise RuntimeError(f"Recorded {call['function']} call failed")
+            return synthesize(call["shape"])
+
+        stand_in.__name__ = function_name
+        setattr(main, function_name, main.recorder.stage(stage)(stand_in))
+
+    def no_referrer_refresh():
+        raise RuntimeError("The referrer board is not available during replay")
+
+    main.autocomplete.refresh_from_referrer_board = no_referrer_refresh
+
+    # Anything that still slips past the stand-ins has no credentials to use
+    main.settings = dataclasses.replace(
+        main.settings, telegram_token=None, img_ocr_api_key=None, monday_api_token=None, service_account_file=None
+    )
+    main.TOKEN = main.MONDAY_API_TOKEN = None
+
+
+async def replay_conversation(main, events, chat_id):
+    context = _Context()
+    for event in events:
+        if event["type"] != "update":
+            continue
+        handler = getattr(main, event["handler"])
+        await handler(_Update(event["update"], chat_id), context)
+
+
+# Sampling profiler: records the stack of every thread at a fixed interval
+class StackSampler:
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.is_set():
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                thread_name = names.get(ident, str(ident)).split("-")[0]
+                self.stacks[";".join([thread_name] + stack[::-1])] += 1
+            time.sleep(self.interval)
+
+
+# Keeps only stacks that pass through `function`, re-rooted at it
+def focus_stacks(stacks, function):
+    focused = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        for i, frame in enumerate(frames):
+            if frame.split(":")[-1] == function:
+                focused[";".join(frames[i:])] += count
+                break
+    return focused
+
+
+# Collapsed stacks from a cProfile run, so it gets a flame graph too. cProfile only keeps
+# caller -> callee totals, so time below a function is split across its callers pro rata.
+def pstats_to_folded(stats, min_seconds=1e-5, max_depth=64):
+    totals = {}
+    callees = defaultdict(dict)
+    for func, (_, _, own_time, cumulative, callers) in stats.stats.items():
+        totals[func] = cumulative
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+
+    def label(func):
+        filename, _, name = func
+        return f"{Path(filename).stem}:{name}" if filename != "~" else name
+
+    folded = Counter()
+
+    def walk(func, path, on_path, seconds):
+        scale = seconds / totals[func] if totals[func] else 0
+        frames = path + [label(func)]
+        on_path = on_path | {func}
+        below = 0.0
+        if len(frames) < max_depth:
+            for callee, edge_seconds in callees.get(func, {}).items():
+                share = edge_seconds * scale
+                if share < min_seconds or callee in on_path:
+                    continue  # Too small to show, or recursion
+                below += share
+                walk(callee, frames, on_path, share)
+        own = max(seconds - below, 0.0)
+        if own >= min_seconds:
+            folded[";".join(frames)] += int(own * 1_000_000)  # microseconds
+
+    roots = [func for func, entry in stats.stats.items() if not entry[4]]
+    for root in roots:
+        walk(root, [], frozenset(), totals[root])
+    return folded
+
+
+def write_folded(stacks, path):
+    with open(path, "w") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+# Minimal flame graph renderer (same idea as flamegraph.pl)
+def write_flame_graph(stacks, path, title="Flame graph", width=1200, row_height=16):
+    root = {"name": "all", "count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"name": frame, "count": 0, "children": {}})
+            node["count"] += count
+
+    rects = []
+    max_depth = 0
+
+    def layout(node, x, depth):
+        nonlocal max_depth
+        max_depth = max(max_depth, depth)
+        rects.append((node, x, depth))
+        child_x = x
+        for child in sorted(node["children"].values(), key=lambda n: n["name"]):
+            layout(child, child_x, depth + 1)
+            child_x += child["count"]
+
+    layout(root, 0, 0)
+    total = max(root["count"], 1)
+    height = (max_depth + 1) * row_height + 40
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+        f'<text x="{width / 2}" y="16" text-anchor="middle" font-size="14">{html.escape(title)}</text>',
+    ]
+    for node, x, depth in rects:
+        w = node["count"] / total * width
+        if w < 0.5:
+            continue
+        px = x / total * width
+        y = height - (depth + 1) * row_height
+        hue = zlib.crc32(node["name"].encode()) % 60
+        label = html.escape(node["name"])
+        percent = node["count"] / total * 100
+        parts.append(
+            f'<g><title>{label} ({node["count"]} samples, {percent:.1f}%)</title>'
+            f'<rect x="{px:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" fill="hsl({hue},80%,60%)"/>'
+        )
+        if w > 40:
+            parts.append(f'<text x="{px + 3:.1f}" y="{y + row_height - 4}">{label[:int(w / 7)]}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    Path(path).write_text("\n".join(parts))
+
+
+# Per-stage and per-handler timings from the traces written during the replay
+def summarize(trace_dir):
+    timings = defaultdict(list)
+    for path in Path(trace_dir).glob("*.jsonl"):
+        for event in load_trace(path):
+            if event["type"] == "call":
+                timings[f"stage:{event['stage']}:{event['function']}"].append(event["duration"])
+            elif event["type"] == "update":
+                timings[f"handler:{event['handler']}"].append(event["duration"])
+
+    summary = {}
+    for name, values in sorted(timings.items()):
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "total": sum(values),
+            "mean": statistics.mean(values),
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        }
+    return summary
+
+
+def run(args):
+    # Keep the replay away from the real folders and record into a scratch trace directory
+    work_dir = Path(tempfile.mkdtemp(prefix="replay-"))
+    os.environ.setdefault("WARM_UP_BACKENDS", "0")
+    import main
+
+    main.IMAGE_FOLDER = work_dir / "images"
+    main.PDF_FOLDER = work_dir / "pdfs"
+    main.TELEGRAM_PDF_FOLDER = work_dir / "telegram_pdfs"
+    for folder in (main.IMAGE_FOLDER, main.PDF_FOLDER, main.TELEGRAM_PDF_FOLDER):
+        folder.mkdir()
+    main.recorder.trace_dir = work_dir / "traces"
+
+    traces = [load_trace(path) for path in args.traces]
+    install_stand_ins(main, [event for trace in traces for event in trace], latency=not args.no_latency)
+
+    async def replay_all():
+        for chat_id, events in enumerate(traces, start=1):
+            await replay_conversation(main, events, chat_id)
+
+    out = Path(args.out)
+    started = time.perf_counter()
+    if args.profiler == "cprofile":
+        # cProfile only sees the event loop thread; use the sampling profiler to include scheduler workers
+        profiler = cProfile.Profile()
+        profiler.enable()
+        asyncio.run(replay_all())
+        profiler.disable()
+        profiler.dump_stats(out.with_suffix(".pstats"))
+        stats = pstats.Stats(profiler)
+        stats.sort_stats("cumulative").print_stats(25)
+        stacks = pstats_to_folded(stats)
+    else:
+        sampler = StackSampler(args.interval)
+        sampler.start()
+        asyncio.run(replay_all())
+        sampler.stop()
+        stacks = sampler.stacks
+    elapsed = time.perf_counter() - started
+
+    report = {"traces": [str(path) for path in args.traces], "elapsed": elapsed, "timings": summarize(main.recorder.trace_dir)}
+    out.write_text(json.dumps(report, indent=2))
+
+    if stacks:
+        if args.focus:
+            stacks = focus_stacks(stacks, args.focus)
+        write_folded(stacks, out.with_suffix(".folded"))
+        write_flame_graph(stacks, out.with_suffix(".svg"), title=f"Replay of {len(traces)} trace(s)" + (f" - {args.focus}" if args.focus else ""))
+
+    print(f"Replayed {len(traces)} trace(s) in {elapsed:.2f}s, report written to {out}")
+
+
+def compare(args):
+    old = json.loads(Path(args.old).read_text())["timings"]
+    new = json.loads(Path(args.new).read_text())["timings"]
+    print(f"{'timing':<55} {'old mean':>10} {'new mean':>10} {'change':>8}")
+    for name in sorted(set(old) | set(new)):
+        old_mean = old.get(name, {}).get("mean")
+        new_mean = new.get(name, {}).get("mean")
+        if old_mean and new_mean:
+            change = f"{(new_mean - old_mean) / old_mean * 100:+.1f}%"
+        else:
+            change = "n/a"
+        fmt = lambda value: f"{value * 1000:.1f}ms" if value is not None else "-"
+        print(f"{name:<55} {fmt(old_mean):>10} {fmt(new_mean):>10} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded conversation traces with a profiler attached.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Replay traces and profile them")
+    run_parser.add_argument("traces", nargs="+", type=Path)
+    run_parser.add_argument("--out", default="replay_report.json")
+    run_parser.add_argument("--profiler", choices=["sampling", "cprofile"], default="sampling")
+    run_parser.add_argument("--interval", type=float, default=0.002, help="Sampling interval in seconds")
+    run_parser.add_argument("--focus", help="Only show stacks through this function in the flame graph")
+    run_parser.add_argument("--no-latency", action="store_true", help="Don't wait for recorded external call durations")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare stage timings of two replay reports")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
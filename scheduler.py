@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+# Scheduler priorities (lower runs first)
+INTERACTIVE, BATCH = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+# Central scheduler shared by the Telegram handlers and the folder watcher
+class WorkScheduler:
+    """
+    Runs blocking pipeline calls on a pool of worker threads.
+
+    Jobs are picked by priority first (interactive before batch), then round-robin
+    across keys (one key per chat/agent) so a single busy agent can't starve the rest.
+    A job only starts when its resource (ocr, ai, monday, drive) is under its limit.
+    """
+
+    def __init__(self, limits, history=500):
+        self.limits = dict(limits)
+        self.active = defaultdict(int)  # resource -> running jobs
+        self.queues = {priority: defaultdict(deque) for priority in PRIORITY_NAMES}  # priority -> key -> jobs
+        self.key_order = {priority: deque() for priority in PRIORITY_NAMES}  # round-robin order of keys
+        self.waits = {priority: deque(maxlen=history) for priority in PRIORITY_NAMES}
+        self.condition = threading.Condition()
+        self.workers = []
+
+    def start(self):
+        if self.workers:
+            return
+        for i in range(sum(self.limits.values())):
+            worker = threading.Thread(target=self._worker, name=f"scheduler-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, resource, fn, *args, priority=BATCH, key="default", **kwargs):
+        if resource not in self.limits:
+            raise ValueError(f"Unknown scheduler resource: {resource}")
+        self.start()
+        future = Future()
+        with self.condition:
+            queue = self.queues[priority][key]
+            if not queue:
+                self.key_order[priority].append(key)
+            # Jobs run in the submitter's context so the conversation trace follows them
+            queue.append((resource, fn, args, kwargs, future, time.monotonic(), contextvars.copy_context()))
+            self.condition.notify_all()
+        return future
+
+    async def run(self, resource, fn, *args, priority=INTERACTIVE, key="default", **kwargs):
+        # Await a scheduled job from inside a Telegram handler
+        future = self.submit(resource, fn, *args, priority=priority, key=key, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    def _next_job(self):
+        # Caller must hold self.condition
+        for priority in sorted(self.queues):
+            order = self.key_order[priority]
+            for _ in range(len(order)):
+                key = order[0]
+                order.rotate(-1)
+                queue = self.queues[priority][key]
+                resource = queue[0][0]
+                if self.active[resource] >= self.limits[resource]:
+                    continue
+                job = queue.popleft()
+                if not queue:
+                    order.remove(key)
+                    del self.queues[priority][key]
+                self.active[resource] += 1
+                self.waits[priority].append(time.monotonic() - job[5])
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                job = self._next_job()
+                while job is None:
+                    self.condition.wait()
+                    job = self._next_job()
+            resource, fn, args, kwargs, future, _, job_context = job
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(job_context.run(fn, *args, **kwargs))
+                    except Exception as e:
+                        future.set_exception(e)
+            finally:
+                with self.condition:
+                    self.active[resource] -= 1
+                    self.condition.notify_all()
+
+    def wait_stats(self):
+        """Returns queue depth and wait time percentiles (seconds) per priority."""
+        stats = {}
+        with self.condition:
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self.waits[priority])
+                queued = sum(len(queue) for queue in self.queues[priority].values())
+                if waits:
+                    stats[name] = {
+                        "queued": queued,
+                        "samples": len(waits),
+                        "p50": waits[len(waits) // 2],
+                        "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+                        "max": waits[-1],
+                    }
+                else:
+                    stats[name] = {"queued": queued, "samples": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return stats
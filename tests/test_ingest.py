@@ -0,0 +1,123 @@
+import os
+import time
+from pathlib import Path
+
+from ingest import SharedFolderIngester
+
+_original_name = SharedFolderIngester._original_name
+
+
+def _ingester(folder, node_id, created, lease_ttl=60):
+    ingester = SharedFolderIngester(
+        folder, node_id, lease_ttl,
+        extract=lambda pdf_path: {"content": "{}"},
+        create_item=lambda data, pdf_path: created.append(_original_name(Path(pdf_path).name)),
+    )
+    ingester.SETTLE_SECONDS = 0
+    ingester.prepare()
+    return ingester
+
+
+def _drain(ingesters):
+    # Let the nodes take turns claiming until the folder is empty
+    while True:
+        claimed_any = False
+        for ingester in ingesters:
+            claimed = ingester._claim_next()
+            if claimed is not None:
+                claimed_any = True
+                ingester._process(claimed)
+        if not claimed_any:
+            return
+
+
+def test_each_file_is_ingested_once_across_nodes(tmp_path):
+    for i in range(20):
+        (tmp_path / f"doc{i}.pdf").write_bytes(f"pdf {i}".encode())
+    created = []
+
+    _drain([_ingester(tmp_path, "node-a", created), _ingester(tmp_path, "node-b", created)])
+
+    assert sorted(created) == sorted(f"doc{i}.pdf" for i in range(20))
+    assert len(list((tmp_path / "processed").glob("*.pdf"))) == 20
+
+
+def test_expired_lease_files_are_reclaimed(tmp_path):
+    created = []
+    live = _ingester(tmp_path, "live", created, lease_ttl=1)
+
+    dead_dir = tmp_path / ".claims" / "dead"
+    dead_dir.mkdir()
+    (dead_dir / "123-1__stuck.pdf").write_bytes(b"stuck")
+    dead_lease = tmp_path / ".claims" / "dead.lease"
+    dead_lease.touch()
+
+    # A fresh lease is left alone
+    live._reclaim_expired()
+    assert (dead_dir / "123-1__stuck.pdf").exists()
+
+    os.utime(dead_lease, (time.time() - 5, time.time() - 5))
+    live._reclaim_expired()
+    assert not dead_lease.exists()
+    assert not dead_dir.exists()
+
+    _drain([live])
+    assert created == ["stuck.pdf"]
+
+
+def test_own_claims_are_returned_on_restart(tmp_path):
+    claim_dir = tmp_path / ".claims" / "fixed"
+    claim_dir.mkdir(parents=True)
+    (claim_dir / "123-1__left.pdf").write_bytes(b"left")
+    created = []
+
+    restarted = _ingester(tmp_path, "fixed", created)
+    assert (tmp_path / "123-1__left.pdf").exists()
+
+    _drain([restarted])
+    assert created == ["left.pdf"]
+
+
+def test_completion_marker_prevents_a_second_item(tmp_path):
+    created = []
+    ingester = _ingester(tmp_path, "node-a", created)
+    (tmp_path / "doc.pdf").write_bytes(b"same content")
+    _drain([ingester])
+
+    # The same document comes back, e.g. reclaimed after the item was created but before the final rename
+    (tmp_path / "doc.pdf").write_bytes(b"same content")
+    _drain([ingester])
+
+    assert created == ["doc.pdf"]
+
+
+def test_stale_own_lease_skips_item_creation(tmp_path):
+    created = []
+    ingester = _ingester(tmp_path, "node-a", created, lease_ttl=2)
+    (tmp_path / "doc.pdf").write_bytes(b"pdf")
+    claimed = ingester._claim_next()
+
+    os.utime(ingester.lease_path, (time.time() - 1.5, time.time() - 1.5))
+    ingester._process(claimed)
+
+    assert created == []
+    assert not claimed.exists()
+    assert (tmp_path / claimed.name).exists()  # Back in the folder for the next claim
+
+    # Once the heartbeat renews the lease, the file is picked up again
+    ingester.lease_path.touch()
+    _drain([ingester])
+    assert created == ["doc.pdf"]
+
+
+def test_double_underscore_names_are_kept(tmp_path):
+    created = []
+    ingester = _ingester(tmp_path, "node-a", created)
+    (tmp_path / "scan__2024.pdf").write_bytes(b"pdf")
+
+    claimed = ingester._claim_next()
+    ingester._return_to_folder(claimed)  # Claimed twice, e.g. after a reclaim
+    _drain([ingester])
+
+    assert created == ["scan__2024.pdf"]
+    assert [p.name.split(".")[0] for p in (tmp_path / ".done").iterdir()] == ["scan__2024"]
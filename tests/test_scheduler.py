@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scheduler import BATCH, INTERACTIVE, WorkScheduler
+
+
+def _blocked_scheduler(limits):
+    # Occupies every slot of "ai" so jobs queue up until release is set
+    scheduler = WorkScheduler(limits)
+    release = threading.Event()
+    blockers = [scheduler.submit("ai", release.wait, key="blocker") for _ in range(limits["ai"])]
+    while scheduler.active["ai"] < limits["ai"]:
+        time.sleep(0.001)
+    return scheduler, release, blockers
+
+
+def test_interactive_runs_before_batch_and_keys_take_turns():
+    scheduler, release, blockers = _blocked_scheduler({"ai": 1})
+    order = []
+    futures = [scheduler.submit("ai", order.append, ("batch", i), priority=BATCH, key="whatsapp") for i in range(2)]
+    futures += [scheduler.submit("ai", order.append, ("busy", i), priority=INTERACTIVE, key="chat:1") for i in range(3)]
+    futures += [scheduler.submit("ai", order.append, ("quiet", 0), priority=INTERACTIVE, key="chat:2")]
+
+    release.set()
+    for future in blockers + futures:
+        future.result(timeout=5)
+
+    assert order == [("busy", 0), ("quiet", 0), ("busy", 1), ("busy", 2), ("batch", 0), ("batch", 1)]
+
+
+def test_resource_limits_are_enforced_per_dependency():
+    scheduler = WorkScheduler({"ai": 2, "drive": 1})
+    running = {"ai": 0, "drive": 0}
+    peak = {"ai": 0, "drive": 0}
+    lock = threading.Lock()
+
+    def job(resource):
+        with lock:
+            running[resource] += 1
+            peak[resource] = max(peak[resource], running[resource])
+        time.sleep(0.02)
+        with lock:
+            running[resource] -= 1
+
+    futures = [scheduler.submit(resource, job, resource, key=f"chat:{i}") for i in range(6) for resource in ("ai", "drive")]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert peak == {"ai": 2, "drive": 1}
+
+
+def test_saturated_resource_does_not_block_other_resources():
+    scheduler, release, blockers = _blocked_scheduler({"ai": 1, "ocr": 1})
+    try:
+        assert scheduler.submit("ocr", lambda: "done", key="chat:1").result(timeout=5) == "done"
+    finally:
+        release.set()
+    for future in blockers:
+        future.result(timeout=5)
+
+
+def test_run_awaits_result_and_records_wait_times():
+    scheduler = WorkScheduler({"ai": 1})
+
+    async def main():
+        return await scheduler.run("ai", lambda value: value * 2, 21, key="chat:1")
+
+    assert asyncio.run(main()) == 42
+    stats = scheduler.wait_stats()
+    assert stats["interactive"]["samples"] == 1
+    assert stats["batch"]["samples"] == 0
+
+
+def test_unknown_resource_is_rejected():
+    scheduler = WorkScheduler({"ai": 1})
+    with pytest.raises(ValueError):
+        scheduler.submit("fax", print)
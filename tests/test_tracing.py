@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from replay import synthesize
+from tracing import payload_shape
+
+# Return values of the functions main.py records as external stages
+STAGE_RESULTS = {
+    "extract_text_from_image_ocr": "POLICY SCHEDULE\nVehicle No: SGX1234A\n",
+    "extract_text_from_pdf": {
+        "content": "```json\n" + json.dumps({
+            "Vehicle_No": "SGX1234A",
+            "Original_Registration_Date": "01 Jan 2020",
+            "Engine_Capacity": 1598,
+            "Owner": {"Name": "Tan Ah Kow", "Phone": "91234567"},
+            "Drivers": [{"Name": "Tan Ah Kow"}, {"Name": "Lim Mei Ling"}],
+        }) + "\n```",
+    },
+    "prepare_drive_archive": (
+        "https://drive.google.com/drive/folders/1AbCdEf",
+        {"/srv/bot/image_folder/123456/a.jpg": "0f" * 32, "/srv/bot/telegram_pdf_folder/123456/b.pdf": "1e" * 32},
+    ),
+    "prepare_drive_archive (nothing to upload)": ("https://drive.google.com/drive/folders/1AbCdEf", {}),
+    "upload_session_file": "1XyZ",
+    "create_monday_item_from_json": None,
+    "is_valid_pdf": True,
+}
+
+
+@pytest.mark.parametrize("value", STAGE_RESULTS.values(), ids=STAGE_RESULTS.keys())
+def test_synthesized_payload_has_the_recorded_shape(value):
+    shape = json.loads(json.dumps(payload_shape(value)))  # As read back from a trace file
+    assert payload_shape(synthesize(shape)) == shape
+
+
+def test_drive_archive_result_unpacks_like_the_real_one():
+    folder_link, pending = synthesize(payload_shape(STAGE_RESULTS["prepare_drive_archive"]))
+    assert isinstance(folder_link, str)
+    assert len(pending) == 2 and all(isinstance(h, str) for h in pending.values())
+
+
+def test_mapping_keys_are_not_recorded():
+    shape = json.dumps(payload_shape(STAGE_RESULTS["prepare_drive_archive"]))
+    assert "123456" not in shape and "image_folder" not in shape
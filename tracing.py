@@ -0,0 +1,181 @@
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Opt-in recorder for anonymized conversation traces.
+# A trace is one JSON object per line: a "conversation" header, then "update" events for every
+# handler call and "call" events for every external stage (OCR, AI, Drive, Monday).
+# Only shapes, sizes and timings are stored, never message text, names, IDs or extracted values.
+
+# Trace of the conversation the current code is running for (copied into scheduler jobs)
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# Dict keys that look like field names are kept; any other key (a file path, an ID) makes the
+# dict a mapping whose keys are data, so only its size and one key/value shape are stored
+FIELD_NAME = re.compile(r"^[A-Za-z_][\w .-]{0,63}$")
+
+
+def payload_shape(value, depth=0):
+    """Describes the structure of a payload without keeping any of its values."""
+    if depth > 8:
+        return "..."
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return type(value).__name__
+    if isinstance(value, str):
+        # AI responses carry JSON inside a string (sometimes wrapped in a ```json fence)
+        text = value.strip()
+        if text.startswith("```json"):
+            text = text.strip("```json").strip()
+        if text[:1] in ("{", "["):
+            try:
+                return {"json": payload_shape(json.loads(text), depth + 1)}
+            except ValueError:
+                pass
+        return {"str": len(value)}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and FIELD_NAME.match(key) for key in value):
+            return {"dict": {key: payload_shape(item, depth + 1) for key, item in value.items()}}
+        key, item = next(iter(value.items()))
+        return {"mapping": len(value), "key": payload_shape(key, depth + 1), "value": payload_shape(item, depth + 1)}
+    if isinstance(value, tuple):
+        # Tuples are fixed records (e.g. (folder_link, pending)), so every element is kept
+        return {"tuple": [payload_shape(item, depth + 1) for item in value]}
+    if isinstance(value, list):
+        return {"list": len(value), "item": payload_shape(value[0], depth + 1) if value else None}
+    return type(value).__name__
+
+
+def update_shape(update):
+    """Anonymized description of a Telegram update: what kind it was, not what it said."""
+    if getattr(update, "callback_query", None):
+        # Callback data are our own button IDs, not user input
+        return {"kind": "callback", "data": update.callback_query.data}
+    message = getattr(update, "message", None)
+    if message is None:
+        return {"kind": "other"}
+    if message.photo:
+        largest = message.photo[-1]
+        return {"kind": "photo", "width": largest.width, "height": largest.height, "file_size": largest.file_size}
+    text = message.text or ""
+    if text.startswith("/"):
+        return {"kind": "command", "command": text.split()[0]}
+    # The confirmation step branches on "yes", so keep that bit
+    return {"kind": "text", "length": len(text), "is_yes": text.strip().lower() == "yes"}
+
+
+class Trace:
+    def __init__(self, path, chat):
+        self.path = Path(path)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.write({"type": "conversation", "chat": chat, "started_at": time.time()})
+
+    def write(self, event):
+        event.setdefault("t", round(time.monotonic() - self.started, 6))
+        line = json.dumps(event)
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class ConversationRecorder:
+    """
+    Writes one trace file per conversation to trace_dir. Does nothing while trace_dir is None.
+
+    Decorate conversation handlers with handler() and external calls with stage(name).
+    """
+
+    def __init__(self, trace_dir=None, salt=None):
+        self.trace_dir = trace_dir
+        self.salt = salt or os.urandom(16).hex()  # Per-process salt so chat IDs can't be reversed
+        self.traces = {}  # anonymized chat -> Trace
+        self.stages = {}  # function name -> stage, for every function decorated with stage()
+
+    @property
+    def enabled(self):
+        return self.trace_dir is not None
+
+    def _anonymize(self, chat_id):
+        return hashlib.sha256(f"{self.salt}:{chat_id}".encode()).hexdigest()[:16]
+
+    def _trace_for(self, chat_id, new_conversation):
+        chat = self._anonymize(chat_id)
+        trace = self.traces.get(chat)
+        if trace is None or new_conversation:
+            Path(self.trace_dir).mkdir(parents=True, exist_ok=True)
+            path = Path(self.trace_dir) / f"{int(time.time())}-{chat}-{uuid.uuid4().hex[:8]}.jsonl"
+            trace = self.traces[chat] = Trace(path, chat)
+        return trace
+
+    def handler(self, fn):
+        @functools.wraps(fn)
+        async def wrapper(update, context, *args, **kwargs):
+            chat = getattr(update, "effective_chat", None)
+            if not self.enabled or chat is None:
+                return await fn(update, context, *args, **kwargs)
+
+            trace = self._trace_for(chat.id, new_conversation=fn.__name__ == "start")
+            token = current_trace.set(trace)
+            started = time.monotonic()
+            state, ok = None, False
+            try:
+                state = await fn(update, context, *args, **kwargs)
+                ok = True
+                return state
+            finally:
+                trace.write({
+                    "type": "update",
+                    "t": round(started - trace.started, 6),
+                    "handler": fn.__name__,
+                    "update": update_shape(update),
+                    "duration": round(time.monotonic() - started, 6),
+                    "state": state if isinstance(state, int) else None,
+                    "ok": ok,
+                })
+                current_trace.reset(token)
+        return wrapper
+
+    def stage(self, name):
+        def decorator(fn):
+            self.stages[fn.__name__] = name
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                trace = current_trace.get()
+                if trace is None:
+                    return fn(*args, **kwargs)
+
+                started = time.monotonic()
+                result, ok = None, False
+                try:
+                    result = fn(*args, **kwargs)
+                    ok = True
+                    return result
+                finally:
+                    trace.write({
+                        "type": "call",
+                        "t": round(started - trace.started, 6),
+                        "stage": name,
+                        "function": fn.__name__,
+                        "duration": round(time.monotonic() - started, 6),
+                        "ok": ok,
+                        "shape": payload_shape(result),
+                    })
+            return wrapper
+        return decorator
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]